@@ -1,16 +1,44 @@
 import sys
-import json
-import socket
-from urllib import request as urlrequest
-from urllib.error import URLError, HTTPError
+import urllib3
+from urllib3.exceptions import HTTPError, NewConnectionError, TimeoutError as RequestTimeoutError
 from vector_clock import VectorClock
 
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    import json
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    json_loads = json.loads
+
 
 BASE_URL = "http://localhost:8082"
 # BASE_URL = "https://rpc-1-1.onrender.com"
 
 TIMEOUT_SECONDS = 5
 
+# Shared by every request; urllib3 copies headers, so this is never mutated
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Marks a payload that had no "vector_clock" key of its own
+_MISSING = object()
+
+
+def make_pool(timeout: float = TIMEOUT_SECONDS) -> urllib3.PoolManager:
+    """Create a keep-alive connection pool so repeated RPCs reuse one socket."""
+    return urllib3.PoolManager(
+        num_pools=4,
+        maxsize=8,
+        retries=False,
+        timeout=urllib3.Timeout(connect=timeout, read=timeout),
+    )
+
+
+# Shared pool for the module-level call_rpc helper
+_http = make_pool()
+
 
 class RpcClient:
     """RPC Client with vector clock support."""
@@ -20,84 +48,96 @@ class RpcClient:
         self.base_url = base_url
         self.vector_clock = VectorClock(client_id, [client_id, "server"])
         self.timeout = TIMEOUT_SECONDS
+        self.http = make_pool(self.timeout)
+        # endpoint -> full URL, built on first use
+        self._urls = {}
         
     def call_rpc(self, endpoint: str, payload: dict):
         """Make RPC call with vector clock propagation."""
         # Increment client clock before sending
         self.vector_clock.increment()
         
-        # Add vector clock to payload
-        payload_with_clock = payload.copy()
-        payload_with_clock["vector_clock"] = self.vector_clock.to_dict()
+        # Add vector clock to payload in place, then restore the caller's dict
+        previous = payload.get("vector_clock", _MISSING)
+        payload["vector_clock"] = self.vector_clock.to_dict()
+        try:
+            body = json_dumps(payload)
+        finally:
+            if previous is _MISSING:
+                del payload["vector_clock"]
+            else:
+                payload["vector_clock"] = previous
         
-        url = f"{self.base_url}{endpoint}"
-        body = json.dumps(payload_with_clock).encode("utf-8")
-        req = urlrequest.Request(url, data=body, headers={"Content-Type": "application/json"}, method="POST")
+        url = self._urls.get(endpoint)
+        if url is None:
+            url = self._urls[endpoint] = self.base_url + endpoint
         
         try:
-            with urlrequest.urlopen(req, timeout=self.timeout) as resp:
-                charset = resp.headers.get_content_charset() or "utf-8"
-                raw = resp.read().decode(charset)
-                data = json.loads(raw)
-                
-                # Update client clock with server response
-                if "vector_clock" in data:
-                    server_clock = VectorClock.from_dict(data["vector_clock"], "server")
-                    self.vector_clock.update(server_clock)
-                    
-                # Log causality information
-                if "causality" in data:
-                    causality = data["causality"]
-                    print(f"[{self.client_id}] Causality: {causality['relationship']}")
-                    print(f"[{self.client_id}] Client clock: {causality.get('client_clock', 'N/A')}")
-                    print(f"[{self.client_id}] Server clock: {causality.get('server_clock', 'N/A')}")
-                
-                return data.get("result"), data
-                
+            resp = self.http.request("POST", url, body=body, headers=JSON_HEADERS)
+        except NewConnectionError as e:
+            # A ConnectTimeoutError subclass in urllib3 2.x, but not a timeout
+            print(f"[{self.client_id}] Request failed: {e}")
+            return None, None
+        except RequestTimeoutError:
+            print(f"[{self.client_id}] Request timed out")
+            return None, None
         except HTTPError as e:
+            print(f"[{self.client_id}] Request failed: {e}")
+            return None, None
+        
+        if resp.status >= 400:
             try:
-                raw = e.read().decode("utf-8")
-                data = json.loads(raw)
-                print(f"[{self.client_id}] Request failed: HTTP {e.code} - {data}")
+                data = json_loads(resp.data)
+                print(f"[{self.client_id}] Request failed: HTTP {resp.status} - {data}")
             except Exception:
-                print(f"[{self.client_id}] Request failed: HTTP {e.code}")
-            return None, None
-        except URLError as e:
-            if isinstance(e.reason, (TimeoutError, socket.timeout)):
-                print(f"[{self.client_id}] Request timed out")
-            else:
-                print(f"[{self.client_id}] Request failed: {e}")
+                print(f"[{self.client_id}] Request failed: HTTP {resp.status}")
             return None, None
+        
+        data = json_loads(resp.data)
+        
+        # Update client clock with server response
+        if "vector_clock" in data:
+            server_clock = VectorClock.from_dict(data["vector_clock"], "server")
+            self.vector_clock.update(server_clock)
+            
+        # Log causality information
+        if "causality" in data:
+            causality = data["causality"]
+            print(f"[{self.client_id}] Causality: {causality['relationship']}")
+            print(f"[{self.client_id}] Client clock: {causality.get('client_clock', 'N/A')}")
+            print(f"[{self.client_id}] Server clock: {data.get('vector_clock', 'N/A')}")
+        
+        return data.get("result"), data
     
     def get_clock(self):
         """Get current vector clock."""
-        return self.vector_clock.to_dict()
+        return self.vector_clock.clock
 
 
 def call_rpc(endpoint: str, payload: dict):
     url = f"{BASE_URL}{endpoint}"
-    body = json.dumps(payload).encode("utf-8")
-    req = urlrequest.Request(url, data=body, headers={"Content-Type": "application/json"}, method="POST")
+    body = json_dumps(payload)
     try:
-        with urlrequest.urlopen(req, timeout=TIMEOUT_SECONDS) as resp:
-            charset = resp.headers.get_content_charset() or "utf-8"
-            raw = resp.read().decode(charset)
-            data = json.loads(raw)
-            return data.get("result")
+        resp = _http.request("POST", url, body=body, headers=JSON_HEADERS)
+    except NewConnectionError as e:
+        # A ConnectTimeoutError subclass in urllib3 2.x, but not a timeout
+        print(f"Request failed: {e}")
+        return None
+    except RequestTimeoutError:
+        print("Request timed out")
+        return None
     except HTTPError as e:
+        print(f"Request failed: {e}")
+        return None
+    if resp.status >= 400:
         try:
-            raw = e.read().decode("utf-8")
-            data = json.loads(raw)
-            print(f"Request failed: HTTP {e.code} - {data}")
+            data = json_loads(resp.data)
+            print(f"Request failed: HTTP {resp.status} - {data}")
         except Exception:
-            print(f"Request failed: HTTP {e.code}")
-        return None
-    except URLError as e:
-        if isinstance(e.reason, (TimeoutError, socket.timeout)):
-            print("Request timed out")
-        else:
-            print(f"Request failed: {e}")
+            print(f"Request failed: HTTP {resp.status}")
         return None
+    data = json_loads(resp.data)
+    return data.get("result")
 
 
 def main():
@@ -166,10 +206,37 @@ def demo_causality():
     print(f"\nFinal clock relationship: {final_relationship}")
 
 
+def check_oversized_clock():
+    """Check that clocks near or past the 64-bit limit don't break later calls."""
+    print("\n=== Oversized Clock Check ===")
+    
+    # 1e20 doesn't fit in 64 bits; 2**63 - 1 fits but leaves the server's
+    # counter no room to tick, and 2**63 - 2 leaves it one tick. The server
+    # must ignore all of them rather than merge them.
+    for value in (1e20, 2 ** 63 - 1, 2 ** 63 - 2):
+        body = json_dumps({"x": 1, "y": 1, "vector_clock": {"server": value}})
+        try:
+            resp = _http.request("POST", f"{BASE_URL}/add", body=body, headers=JSON_HEADERS)
+            print(f"Clock {value!r}: HTTP {resp.status} {resp.data.decode()}")
+        except HTTPError as e:
+            print(f"Clock {value!r}: request failed: {e}")
+    
+    # Twice, so a counter left one tick from the limit would show up too
+    for _ in range(2):
+        result = call_rpc("/add", {"x": 2, "y": 3})
+        print(f"add(2,3) after oversized clocks = {result}")
+        if result != 5:
+            print("FAILED: server stopped answering after an oversized clock")
+            sys.exit(1)
+    print("OK")
+
+
 if __name__ == "__main__":
     import sys
     if len(sys.argv) > 1 and sys.argv[1] == "causality":
         demo_causality()
+    elif len(sys.argv) > 1 and sys.argv[1] == "oversized":
+        check_oversized_clock()
     else:
         main()
 
@@ -0,0 +1,70 @@
+"""
+Kernels for array-backed vector clocks.
+
+compare_counters and merge_counters work on equal-length int64 NumPy arrays.
+They are compiled ahead of first use with Numba when it is installed, and fall
+back to NumPy ufuncs otherwise. They live outside vector_clock.py so that
+module can still be compiled with Cython.
+"""
+
+from typing import Any, Callable
+
+import numpy as np
+
+try:
+    from numba import njit, int8, int64, void
+    # Whether the kernels are Numba-compiled
+    JIT = True
+except ImportError:  # Numba is optional
+    JIT = False
+
+
+# Bit flags returned by compare_counters
+SELF_GREATER = 2
+OTHER_GREATER = 1
+
+
+def _compare_loop(a, b) -> int:
+    """Return SELF_GREATER and/or OTHER_GREATER flags for a vs b."""
+    self_greater = 0
+    other_greater = 0
+    for i in range(a.shape[0]):
+        # Compare directly: a[i] - b[i] can overflow int64
+        if a[i] > b[i]:
+            self_greater = SELF_GREATER
+        elif a[i] < b[i]:
+            other_greater = OTHER_GREATER
+        if self_greater and other_greater:
+            break
+    return self_greater | other_greater
+
+
+def _merge_loop(a, b) -> None:
+    """Element-wise max of a and b, written into a."""
+    for i in range(a.shape[0]):
+        if b[i] > a[i]:
+            a[i] = b[i]
+
+
+def _compare_ufuncs(a, b) -> int:
+    """Return SELF_GREATER and/or OTHER_GREATER flags for a vs b."""
+    flags = SELF_GREATER if (a > b).any() else 0
+    if (a < b).any():
+        flags |= OTHER_GREATER
+    return flags
+
+
+def _merge_ufuncs(a, b) -> None:
+    """Element-wise max of a and b, written into a."""
+    np.maximum(a, b, out=a)
+
+
+# The loops are only worth it compiled; plain NumPy uses the ufunc versions
+compare_counters: Callable[[Any, Any], int]
+merge_counters: Callable[[Any, Any], None]
+if JIT:
+    compare_counters = njit(int8(int64[::1], int64[::1]), cache=True)(_compare_loop)
+    merge_counters = njit(void(int64[::1], int64[::1]), cache=True)(_merge_loop)
+else:
+    compare_counters = _compare_ufuncs
+    merge_counters = _merge_ufuncs
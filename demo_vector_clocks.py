@@ -9,6 +9,15 @@ in a simulated distributed RPC system.
 from vector_clock import VectorClock
 import json
 import time
+import numpy as np
+
+
+# Relationship of clock i to clock j, indexed by
+# [i greater somewhere][j greater somewhere], as VectorClock.compare reports it
+RELATIONSHIPS = np.array([
+    ["equal", "happens-before"],
+    ["happens-after", "concurrent"],
+])
 
 
 def simulate_rpc_with_vector_clocks():
@@ -126,17 +135,18 @@ def simulate_distributed_system():
     """Simulate a more complex distributed system scenario."""
     print("\n=== Complex Distributed System Simulation ===")
     
-    # Create a system with 3 nodes
+    # Create a system with 3 nodes; row i is node i's vector clock
     nodes = ["node1", "node2", "node3"]
-    clocks = {}
+    idx = {node: i for i, node in enumerate(nodes)}
+    clocks = np.zeros((len(nodes), len(nodes)), dtype=np.int64)
     
-    # Initialize all clocks
-    for node in nodes:
-        clocks[node] = VectorClock(node, nodes)
+    def show(node):
+        i = idx[node]
+        return f"VC({node}): {dict(zip(nodes, clocks[i].tolist()))}"
     
     print("Initial state:")
-    for node, clock in clocks.items():
-        print(f"  {node}: {clock}")
+    for node in nodes:
+        print(f"  {node}: {show(node)}")
     
     # Simulate a sequence of events
     events = [
@@ -153,31 +163,36 @@ def simulate_distributed_system():
         if len(event) == 2:
             node, action = event
             if action == "increment":
-                clocks[node].increment()
-                print(f"  {i}. {node} increments: {clocks[node]}")
+                clocks[idx[node], idx[node]] += 1
+                print(f"  {i}. {node} increments: {show(node)}")
         elif len(event) == 3:
             sender, action, receiver = event
             if action == "send_to":
+                s, r = idx[sender], idx[receiver]
                 # Sender increments before sending
-                clocks[sender].increment()
+                clocks[s, s] += 1
                 # Receiver updates with sender's clock
-                clocks[receiver].update(clocks[sender])
+                np.maximum(clocks[r], clocks[s], out=clocks[r])
                 print(f"  {i}. {sender} sends to {receiver}")
-                print(f"     {sender}: {clocks[sender]}")
-                print(f"     {receiver}: {clocks[receiver]}")
+                print(f"     {sender}: {show(sender)}")
+                print(f"     {receiver}: {show(receiver)}")
     
     # Final analysis
     print("\nFinal state:")
-    for node, clock in clocks.items():
-        print(f"  {node}: {clock}")
+    for node in nodes:
+        print(f"  {node}: {show(node)}")
+    
+    # Compare all pairs at once: diff[i, j] = clocks[i] - clocks[j]
+    diff = clocks[:, None, :] - clocks[None, :, :]
+    self_greater = (diff > 0).any(axis=-1)
+    other_greater = (diff < 0).any(axis=-1)
+    relationships = RELATIONSHIPS[self_greater.astype(int), other_greater.astype(int)]
     
-    # Compare all pairs
     print("\nPairwise relationships:")
     for i, node1 in enumerate(nodes):
         for j, node2 in enumerate(nodes):
             if i < j:  # Avoid duplicate comparisons
-                relationship = clocks[node1].compare(clocks[node2])
-                print(f"  {node1} vs {node2}: {relationship}")
+                print(f"  {node1} vs {node2}: {relationships[i, j]}")
 
 
 if __name__ == "__main__":
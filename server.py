@@ -1,127 +1,303 @@
-import json
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from vector_clock import VectorClock
+import math
+import operator
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, ClassVar, Dict, Optional, Tuple, Union
+from vector_clock import INT64_MAX, INT64_MIN, VectorClock
 
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    import json
 
-def json_response(handler: BaseHTTPRequestHandler, status: int, payload: dict):
-    body = json.dumps(payload).encode("utf-8")
-    handler.send_response(status)
-    handler.send_header("Content-Type", "application/json")
-    handler.send_header("Content-Length", str(len(body)))
-    handler.end_headers()
-    handler.wfile.write(body)
+    def json_dumps(obj: Any) -> bytes:  # type: ignore[misc]
+        return json.dumps(obj).encode("utf-8")
 
+    json_loads = json.loads  # type: ignore[assignment]
 
-def parse_json(handler: BaseHTTPRequestHandler):
+try:
+    import msgspec
+except ImportError:  # msgspec is optional; every body then takes the generic path
+    msgspec = None  # type: ignore[assignment]
+
+
+Number = Union[int, float]
+# (kind, x, y) where kind is "int" or "float"
+Operands = Tuple[str, Number, Number]
+# (True, Operands) or (False, error message)
+Validation = Tuple[bool, Any]
+
+
+# Pre-rendered status line and headers per status; only Content-Length varies
+RESPONSE_HEADS = {
+    status: (
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+        "Content-Type: application/json\r\n"
+        "Content-Length: %d\r\n"
+        "\r\n"
+    ).encode("latin-1")
+    for status in (200, 400, 404)
+}
+
+
+def json_response(handler: BaseHTTPRequestHandler, status: int, payload: Dict[str, Any]) -> None:
+    body = json_dumps(payload)
+    handler.log_request(status)
+    # One write for head and body instead of send_response/send_header/end_headers
+    handler.wfile.write(RESPONSE_HEADS[status] % len(body) + body)
+
+
+def read_body(handler: BaseHTTPRequestHandler) -> bytes:
+    length_header = handler.headers.get("Content-Length")
+    chunked = "Transfer-Encoding" in handler.headers
+    if chunked or (length_header is None and handler.command == "POST"):
+        # Only Content-Length bodies are read; anything else would be left in
+        # the socket and parsed as the next request, so don't reuse the connection
+        handler.close_connection = True
+        return b""
+    try:
+        length = int(length_header or "0")
+    except ValueError:
+        # The body can't be consumed, so don't reuse the connection
+        handler.close_connection = True
+        return b""
+    return handler.rfile.read(length) if length > 0 else b""
+
+
+def parse_json(raw: bytes) -> Any:
     try:
-        length = int(handler.headers.get("Content-Length", "0"))
-        raw = handler.rfile.read(length) if length > 0 else b""
         if not raw:
             return None
-        return json.loads(raw.decode("utf-8"))
+        return json_loads(raw)
     except Exception:
         return None
 
 
-def validate_operands(payload):
+if msgspec is not None:
+    # Body of /add and /multiply when it holds plain JSON numbers. Built with
+    # defstruct rather than a class statement so mypyc can compile this module.
+    OperandsRequest = msgspec.defstruct("OperandsRequest", [
+        ("x", Union[int, float]),
+        ("y", Union[int, float]),
+        ("vector_clock", Optional[Dict[str, int]], None),
+    ])
+
+    _operands_decoder = msgspec.json.Decoder(OperandsRequest)
+
+
+def decode_operands(raw: bytes) -> Any:
+    """
+    Decode a well-formed /add or /multiply body straight into an OperandsRequest.
+    
+    Returns None when msgspec isn't installed or the body doesn't match the
+    schema (numeric strings, malformed JSON, ...); callers then fall back to
+    parse_json and validate_operands, which handle those cases.
+    """
+    if msgspec is None:
+        return None
+    try:
+        return _operands_decoder.decode(raw)
+    except msgspec.DecodeError:
+        return None
+
+
+def coerce_operand(value: Any) -> Optional[Number]:
+    """Return value as an int or float, or None if it isn't a number."""
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            number = int(value)
+            if INT64_MIN <= number <= INT64_MAX:
+                return number
+        except ValueError:
+            pass
+        try:
+            real = float(value)
+        except ValueError:
+            return None
+        # "inf" and "nan" parse as floats but can't produce a result JSON can carry
+        return real if math.isfinite(real) else None
+    return None
+
+
+# Operand types decoded straight from JSON numbers
+NUMBER_TYPES = (int, float)
+
+
+def validate_operands(payload: Any) -> Validation:
     if not isinstance(payload, dict):
         return False, "Invalid JSON body"
     if "x" not in payload or "y" not in payload:
         return False, "Missing 'x' or 'y' in request body"
-    try:
-        x_val = float(payload["x"]) if isinstance(payload["x"], (int, float, str)) else None
-        y_val = float(payload["y"]) if isinstance(payload["y"], (int, float, str)) else None
-    except (TypeError, ValueError):
-        return False, "'x' and 'y' must be numbers"
+    return classify_operands(payload["x"], payload["y"])
+
+
+def classify_operands(x_val: Any, y_val: Any) -> Validation:
+    # Plain JSON numbers need no coercion; integer operands stay exact
+    x_type = type(x_val)
+    y_type = type(y_val)
+    if x_type is int and y_type is int:
+        return True, ("int", x_val, y_val)
+    if x_type in NUMBER_TYPES and y_type in NUMBER_TYPES:
+        return True, ("float", float(x_val), float(y_val))
+    return _validate_coerced(x_val, y_val)
+
+
+def _validate_coerced(x_val: Any, y_val: Any) -> Validation:
+    """Validate operands that aren't plain JSON numbers (numeric strings, bools)."""
+    x_val = coerce_operand(x_val)
+    y_val = coerce_operand(y_val)
     if x_val is None or y_val is None:
         return False, "'x' and 'y' must be numbers"
-    return True, (x_val, y_val)
+    if isinstance(x_val, int) and isinstance(y_val, int):
+        return True, ("int", x_val, y_val)
+    return True, ("float", float(x_val), float(y_val))
+
+
+def normalize_result(kind: str, result: Any) -> Optional[Number]:
+    """
+    Return result as sent to the client: ints when integral and encodable.
+    
+    Returns None for results that aren't finite, which orjson would encode as null.
+    """
+    if kind == "int":
+        if INT64_MIN <= result <= INT64_MAX:
+            return result
+        try:
+            return float(result)
+        except OverflowError:
+            return None
+    if not math.isfinite(result):
+        return None
+    if result.is_integer() and INT64_MIN <= result <= INT64_MAX:
+        return int(result)
+    return result
+
+
+def handle_root(handler: BaseHTTPRequestHandler) -> None:
+    json_response(handler, 200, {
+        "message": "RPC server is running",
+        "endpoints": {
+            "POST /add": {"x": "number", "y": "number"},
+            "POST /multiply": {"x": "number", "y": "number"},
+            "GET /health": "ok"
+        }
+    })
+
+
+def handle_health(handler: BaseHTTPRequestHandler) -> None:
+    json_response(handler, 200, {"status": "ok"})
 
 
 class RpcHandler(BaseHTTPRequestHandler):
-    # Server's vector clock
-    server_clock = VectorClock("server", ["server"])
+    # Keep connections open so pooled clients skip the TCP handshake per call
+    protocol_version = "HTTP/1.1"
+    # TCP_NODELAY on each connection: every response is one small write
+    # (see json_response), so send it immediately rather than letting Nagle
+    # wait on the client's delayed ACK
+    disable_nagle_algorithm = True
     
-    def do_GET(self):
-        if self.path == "/" or self.path == "":
-            json_response(self, 200, {
-                "message": "RPC server is running",
-                "endpoints": {
-                    "POST /add": {"x": "number", "y": "number"},
-                    "POST /multiply": {"x": "number", "y": "number"},
-                    "GET /health": "ok"
-                }
-            })
-        elif self.path == "/health":
-            json_response(self, 200, {"status": "ok"})
-        else:
-            json_response(self, 404, {"error": "Not found"})
+    # Server's vector clock, shared by all handler threads
+    server_clock: ClassVar[VectorClock] = VectorClock("server", ["server"])
+    clock_lock: ClassVar[threading.Lock] = threading.Lock()
+    
+    # Path -> handler / arithmetic operation, looked up once per request
+    GET_ROUTES: ClassVar[Dict[str, Callable[[BaseHTTPRequestHandler], None]]] = {
+        "/": handle_root, "": handle_root, "/health": handle_health
+    }
+    POST_OPERATIONS: ClassVar[Dict[str, Callable[[Number, Number], Number]]] = {
+        "/add": operator.add, "/multiply": operator.mul
+    }
 
-    def do_POST(self):
-        # Parse request with vector clock
-        payload = parse_json(self)
-        if not payload:
-            json_response(self, 400, {"error": "Invalid JSON"})
+    def do_GET(self) -> None:
+        # Drain any body so it isn't read as the next request on this connection
+        read_body(self)
+        handler = self.GET_ROUTES.get(self.path)
+        if handler is None:
+            json_response(self, 404, {"error": "Not found"})
             return
+        handler(self)
+
+    def do_POST(self) -> None:
+        raw = read_body(self)
+        operation = self.POST_OPERATIONS.get(self.path)
+        
+        # Well-formed /add and /multiply bodies decode straight into a struct;
+        # anything else is parsed generically and validated field by field
+        request = decode_operands(raw) if operation is not None else None
+        if request is not None:
+            payload = None
+            clock_data = request.vector_clock
+        else:
+            # Parse request with vector clock
+            payload = parse_json(raw)
+            if not payload:
+                json_response(self, 400, {"error": "Invalid JSON"})
+                return
+            clock_data = payload.get("vector_clock") if isinstance(payload, dict) else None
             
         # Extract client vector clock if present
         client_clock = None
-        if "vector_clock" in payload:
+        if clock_data is not None:
             try:
-                client_clock = VectorClock.from_dict(payload["vector_clock"], "client")
-                # Update server clock with client clock
-                self.server_clock.update(client_clock)
+                client_clock = VectorClock.from_dict(clock_data, "client")
             except Exception as e:
                 print(f"Error parsing client vector clock: {e}")
         
-        # Increment server clock
-        self.server_clock.increment()
+        # Only the clock mutation and its snapshot hold the lock; validation,
+        # serialization and the socket write run concurrently
+        with self.clock_lock:
+            # Only the server ticks its own entry, so a client can't have seen a
+            # higher value for it; merging a forged one could push the counter
+            # to INT64_MAX, after which every increment would fail
+            own_node = self.server_clock.node_id
+            if client_clock and client_clock.get(own_node) > self.server_clock.get(own_node):
+                print("Ignoring client vector clock ahead of the server's own counter")
+                client_clock = None
+            
+            # Update server clock with client clock
+            if client_clock:
+                self.server_clock.update(client_clock)
+            
+            # Increment server clock
+            self.server_clock.increment()
+            server_clock = self.server_clock.to_dict()
         
-        if self.path == "/add":
-            ok, data = validate_operands(payload)
-            if not ok:
-                json_response(self, 400, {"error": data, "vector_clock": self.server_clock.to_dict()})
-                return
-            x_val, y_val = data
-            result = x_val + y_val
-            if float(result).is_integer():
-                result = int(result)
-            json_response(self, 200, {
-                "result": result, 
-                "vector_clock": self.server_clock.to_dict(),
-                "causality": {
-                    "server_clock": self.server_clock.to_dict(),
-                    "client_clock": client_clock.to_dict() if client_clock else None,
-                    "relationship": self.server_clock.compare(client_clock) if client_clock else "no_client_clock"
-                }
-            })
+        # After merging the client clock and ticking its own entry, the server
+        # clock is >= the client's everywhere and > it on "server", so there is
+        # nothing to compare
+        relationship = "happens-after" if client_clock else "no_client_clock"
+        
+        if operation is None:
+            json_response(self, 404, {"error": "Not found", "vector_clock": server_clock})
             return
-
-        if self.path == "/multiply":
+        
+        if request is not None:
+            ok, data = classify_operands(request.x, request.y)
+        else:
             ok, data = validate_operands(payload)
-            if not ok:
-                json_response(self, 400, {"error": data, "vector_clock": self.server_clock.to_dict()})
-                return
-            x_val, y_val = data
-            result = x_val * y_val
-            if float(result).is_integer():
-                result = int(result)
-            json_response(self, 200, {
-                "result": result, 
-                "vector_clock": self.server_clock.to_dict(),
-                "causality": {
-                    "server_clock": self.server_clock.to_dict(),
-                    "client_clock": client_clock.to_dict() if client_clock else None,
-                    "relationship": self.server_clock.compare(client_clock) if client_clock else "no_client_clock"
-                }
-            })
+        if not ok:
+            json_response(self, 400, {"error": data, "vector_clock": server_clock})
             return
-
-        json_response(self, 404, {"error": "Not found", "vector_clock": self.server_clock.to_dict()})
+        kind, x_val, y_val = data
+        result = normalize_result(kind, operation(x_val, y_val))
+        if result is None:
+            json_response(self, 400, {"error": "Result is not a finite number", "vector_clock": server_clock})
+            return
+        json_response(self, 200, {
+            "result": result, 
+            "vector_clock": server_clock,
+            "causality": {
+                "client_clock": client_clock.to_dict() if client_clock else None,
+                "relationship": relationship
+            }
+        })
 
 
-def run(host: str = "0.0.0.0", port: int = 8080):
-    server = HTTPServer((host, port), RpcHandler)
+def run(host: str = "0.0.0.0", port: int = 8080) -> None:
+    server = ThreadingHTTPServer((host, port), RpcHandler)
     try:
         server.serve_forever()
     except KeyboardInterrupt:
@@ -0,0 +1,33 @@
+"""
+Optional native build of the vector clock and server modules.
+
+Compiles vector_clock.py with Cython, using the static types declared in
+vector_clock.pxd, and server.py with mypyc, using its type annotations.
+The plain Python modules are used when no build is present.
+
+    pip install cython mypy
+    python setup.py build_ext --inplace
+"""
+
+from setuptools import setup
+from Cython.Build import cythonize
+from mypyc.build import mypycify
+
+
+setup(
+    name="rpc-vector-clock",
+    py_modules=["vector_clock", "server"],
+    ext_modules=cythonize(
+        "vector_clock.py",
+        language_level=3,
+        compiler_directives={
+            "boundscheck": False,
+            "wraparound": False,
+            # Types come from vector_clock.pxd, not the Python annotations
+            "annotation_typing": False,
+        },
+    ) + mypycify(
+        # vector_clock is left to Cython above; mypyc only type-checks it
+        ["server.py"],
+    ),
+)
@@ -0,0 +1,28 @@
+# Static types for compiling vector_clock.py with Cython (see setup.py).
+# vector_clock.py stays importable as plain Python when no build is present.
+
+cimport cython
+
+
+cdef class VectorClock:
+    cdef public str node_id
+    # list, or an int64 numpy.ndarray for larger schemas; from_dict and
+    # increment keep every counter within int64, so the longlong locals
+    # below can hold any of them
+    cdef public object counters
+    cdef public tuple _nodes
+    cdef public dict _index
+    cdef public Py_ssize_t _self_idx
+    cdef public dict _cached_dict
+    cdef public bint _dirty
+
+    @cython.locals(idx=Py_ssize_t)
+    cpdef VectorClock increment(self, str node_id=*)
+
+    @cython.locals(index=dict, i=Py_ssize_t, value=cython.longlong)
+    cpdef VectorClock update(self, other_clock)
+
+    @cython.locals(other_index=dict, own_index=dict, i=Py_ssize_t, j=Py_ssize_t,
+                   self_val=cython.longlong, other_val=cython.longlong, flags=cython.int,
+                   self_greater=cython.bint, other_greater=cython.bint)
+    cpdef str compare(self, other_clock)
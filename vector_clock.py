@@ -5,8 +5,88 @@ A vector clock is a data structure used for determining the partial ordering of
 in a distributed system and detecting causality violations.
 """
 
-from typing import Dict, Tuple, Any
-import json
+import sys
+from bisect import bisect_left
+from importlib.util import find_spec
+from typing import Dict, Tuple, Any, Iterable, List, Optional
+
+# NumPy and the array kernels are imported on first use (see _load_arrays):
+# clocks below NUMPY_MIN_NODES never need them, and loading Numba takes
+# a good part of a second
+np: Any = None
+compare_counters: Any = None
+merge_counters: Any = None
+SELF_GREATER = OTHER_GREATER = 0
+_ARRAYS: Optional[bool] = None
+
+
+# Below this many nodes a plain Python loop beats the per-call overhead of the
+# array kernels (compare breaks even at roughly 16 nodes with Numba, 64 without)
+NUMPY_MIN_NODES = 16 if find_spec("numba") is not None else 64
+
+# Counters must fit in 64 bits: orjson can't encode anything wider
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+# Sorted node tuple -> (that tuple, {node_id: index}). Only the node lists clocks
+# are created with are memoized, so clocks created over the same nodes share one
+# tuple and one index map and a schema match is an identity check.
+# Schemas grown by _widen or read by from_dict come from peers and are not
+# memoized (keeping them would grow without bound as new nodes show up), so
+# such clocks take the index-map paths in update() and compare(). On the
+# server that is every request; those paths only walk the client clock's few
+# nodes, which is cheaper than an aligned pass over the whole server schema.
+_SCHEMAS: Dict[Tuple[str, ...], Tuple[Tuple[str, ...], Dict[str, int]]] = {}
+
+
+def _schema(nodes: Iterable[str], memo: bool = False) -> Tuple[Tuple[str, ...], Dict[str, int]]:
+    """Return the canonical (node tuple, index map) for a set of node IDs."""
+    # A clock serialized by to_dict() already lists its nodes in canonical
+    # order, so a memoized schema is found without deduping and sorting. That
+    # hits on a client decoding replies over its own nodes (about 1.8us vs
+    # 3.0us per from_dict); client clocks decoded on the server never match
+    # a memoized schema, and there the extra lookup costs one tuple hash.
+    key = tuple(nodes)
+    schema = _SCHEMAS.get(key)
+    if schema is not None:
+        return schema
+    # dict.fromkeys dedupes without scrambling the order, so sorting mostly
+    # sorted input (a schema plus a few new nodes) stays close to linear
+    key = tuple(sorted(dict.fromkeys(key)))
+    schema = _SCHEMAS.get(key)
+    if schema is None:
+        # Interned IDs let index lookups match by identity instead of string compare
+        key = tuple(map(sys.intern, key))
+        schema = (key, dict(zip(key, range(len(key)))))
+        if memo:
+            _SCHEMAS[key] = schema
+    return schema
+
+
+def _load_arrays() -> bool:
+    """Import NumPy and the array kernels; False if NumPy isn't installed."""
+    global np, compare_counters, merge_counters, SELF_GREATER, OTHER_GREATER, _ARRAYS
+    if _ARRAYS is None:
+        try:
+            import numpy
+            import clock_kernels
+        except ImportError:  # NumPy is optional; clocks then always use plain lists
+            _ARRAYS = False
+        else:
+            np = numpy
+            compare_counters = clock_kernels.compare_counters
+            merge_counters = clock_kernels.merge_counters
+            SELF_GREATER = clock_kernels.SELF_GREATER
+            OTHER_GREATER = clock_kernels.OTHER_GREATER
+            _ARRAYS = True
+    return _ARRAYS
+
+
+def _as_counters(values: List[int]):
+    """Pick the counter storage for a schema with len(values) nodes."""
+    if len(values) >= NUMPY_MIN_NODES and _load_arrays():
+        return np.array(values, dtype=np.int64)
+    return values
 
 
 class VectorClock:
@@ -15,9 +95,13 @@ class VectorClock:
     
     Each node maintains a vector of counters, one for each node in the system.
     The vector clock captures the causal relationships between events.
+    
+    Counters are stored as a flat list (an int64 NumPy array for larger
+    schemas) laid out by a sorted node schema, shared by clocks created over
+    the same nodes; a dict is only built at serialization boundaries (to_dict).
     """
     
-    def __init__(self, node_id: str, all_nodes: list = None):
+    def __init__(self, node_id: str, all_nodes: Optional[list] = None):
         """
         Initialize vector clock for a node.
         
@@ -25,17 +109,61 @@ class VectorClock:
             node_id: Identifier for this node
             all_nodes: List of all node IDs in the system (optional)
         """
-        self.node_id = node_id
-        self.clock = {}
+        self.node_id = sys.intern(node_id)
         
         # Initialize with all known nodes
-        if all_nodes:
-            for node in all_nodes:
-                self.clock[node] = 0
-        else:
-            self.clock[node_id] = 0
+        self._set_nodes(all_nodes if all_nodes else (node_id,), memo=True)
+        self.counters = _as_counters([0] * len(self._nodes))
+        
+        # to_dict() result, rebuilt only after the counters change
+        self._cached_dict: Optional[Dict[str, int]] = None
+        self._dirty = True
+    
+    def _set_nodes(self, nodes: Iterable[str], memo: bool = False) -> None:
+        """Bind this clock to the canonical schema for ``nodes``."""
+        self._nodes, self._index = _schema(nodes, memo)
+        self._self_idx = self._index.get(self.node_id, -1)
+    
+    def _widen(self, nodes: Iterable[str]) -> None:
+        """Re-lay the counters out on a schema that also covers ``nodes``."""
+        old_nodes = self._nodes
+        new_nodes, index = _schema(old_nodes + tuple(nodes))
+        # Both schemas are sorted, so the old counters keep their order and
+        # only need a 0 spliced in where each new node lands
+        values = self._values()
+        counters = []
+        start = 0
+        for node in sorted(set(nodes).difference(self._index)):
+            pos = bisect_left(old_nodes, node)
+            counters += values[start:pos]
+            counters.append(0)
+            start = pos
+        counters += values[start:]
+        # Build the new storage before switching schema, so a failure here
+        # leaves the clock as it was
+        counters = _as_counters(counters)
+        self._nodes = new_nodes
+        self._index = index
+        self._self_idx = index.get(self.node_id, -1)
+        self.counters = counters
+        self._dirty = True
+    
+    def _values(self) -> List[int]:
+        """Counters as a list of Python ints."""
+        counters = self.counters
+        return counters if type(counters) is list else counters.tolist()
     
-    def increment(self, node_id: str = None) -> 'VectorClock':
+    def get(self, node_id: str) -> int:
+        """Counter for node_id (0 if this clock hasn't seen that node)."""
+        idx = self._index.get(node_id, -1)
+        return int(self.counters[idx]) if idx >= 0 else 0
+    
+    @property
+    def clock(self) -> Dict[str, int]:
+        """Counters keyed by node ID (a copy; changing it doesn't affect the clock)."""
+        return dict(self.to_dict())
+    
+    def increment(self, node_id: Optional[str] = None) -> 'VectorClock':
         """
         Increment the counter for the specified node (or self if not specified).
         
@@ -47,10 +175,18 @@ class VectorClock:
         """
         if node_id is None:
             node_id = self.node_id
+            idx = self._self_idx
+        else:
+            idx = self._index.get(node_id, -1)
             
-        if node_id not in self.clock:
-            self.clock[node_id] = 0
-        self.clock[node_id] += 1
+        if idx < 0:
+            self._widen((node_id,))
+            idx = self._index[node_id]
+        # Checked up front: int64 array storage would wrap around silently
+        if self.counters[idx] >= INT64_MAX:
+            raise OverflowError(f"Counter for {node_id!r} exceeds 64-bit range")
+        self.counters[idx] += 1
+        self._dirty = True
         return self
     
     def update(self, other_clock: 'VectorClock') -> 'VectorClock':
@@ -64,11 +200,31 @@ class VectorClock:
         Returns:
             Self for chaining
         """
+        if not isinstance(other_clock, VectorClock):
+            raise TypeError("Can only merge with another VectorClock")
+        
+        self._dirty = True
+        
         # Add any new nodes from other clock
-        for node, value in other_clock.clock.items():
-            if node not in self.clock:
-                self.clock[node] = 0
-            self.clock[node] = max(self.clock[node], value)
+        if other_clock._nodes is not self._nodes:
+            if not self._index.keys() >= other_clock._index.keys():
+                self._widen(other_clock._nodes)
+            
+            if other_clock._nodes is not self._nodes:
+                # Other clock covers a subset of our nodes: merge by index map
+                index = self._index
+                counters = self.counters
+                for node, value in zip(other_clock._nodes, other_clock.counters):
+                    i = index[node]
+                    if value > counters[i]:
+                        counters[i] = value
+                return self
+        
+        counters = self.counters
+        if type(counters) is list:
+            self.counters = [a if a > b else b for a, b in zip(counters, other_clock.counters)]
+        else:
+            merge_counters(counters, other_clock.counters)
         return self
     
     def compare(self, other_clock: 'VectorClock') -> str:
@@ -84,21 +240,50 @@ class VectorClock:
         if not isinstance(other_clock, VectorClock):
             raise TypeError("Can only compare with another VectorClock")
         
-        # Get all unique nodes from both clocks
-        all_nodes = set(self.clock.keys()) | set(other_clock.clock.keys())
-        
         # Initialize comparison flags
         self_greater = False
         other_greater = False
         
-        for node in all_nodes:
-            self_val = self.clock.get(node, 0)
-            other_val = other_clock.clock.get(node, 0)
+        if other_clock._nodes is self._nodes:
+            own = self.counters
+            other = other_clock.counters
+            if type(own) is not list:
+                # Same schema, array storage: one native pass
+                flags = compare_counters(own, other)
+                self_greater = bool(flags & SELF_GREATER)
+                other_greater = bool(flags & OTHER_GREATER)
+            else:
+                # Same schema: one pass over aligned counters, stop once concurrent
+                for i in range(len(own)):
+                    self_val = own[i]
+                    other_val = other[i]
+                    
+                    if self_val > other_val:
+                        self_greater = True
+                        if other_greater:
+                            break
+                    elif other_val > self_val:
+                        other_greater = True
+                        if self_greater:
+                            break
+        else:
+            # Walk this clock's nodes, then the nodes only the other clock
+            # knows about (implicitly 0 here), instead of building a set union
+            other_index = other_clock._index
+            other_counters = other_clock.counters
+            for node, self_val in zip(self._nodes, self.counters):
+                j = other_index.get(node, -1)
+                other_val = other_counters[j] if j >= 0 else 0
+                
+                if self_val > other_val:
+                    self_greater = True
+                elif other_val > self_val:
+                    other_greater = True
             
-            if self_val > other_val:
-                self_greater = True
-            elif other_val > self_val:
-                other_greater = True
+            own_index = self._index
+            for node, other_val in zip(other_clock._nodes, other_counters):
+                if other_val > 0 and node not in own_index:
+                    other_greater = True
         
         # Determine relationship
         if self_greater and not other_greater:
@@ -111,29 +296,46 @@ class VectorClock:
             return 'concurrent'
     
     def to_dict(self) -> Dict[str, int]:
-        """Convert vector clock to dictionary for JSON serialization."""
-        return dict(self.clock)
+        """
+        Convert vector clock to dictionary for JSON serialization.
+        
+        The dict is cached until the clock next changes, so treat it as read-only.
+        """
+        cached = self._cached_dict
+        if self._dirty or cached is None:
+            cached = self._cached_dict = dict(zip(self._nodes, self._values()))
+            self._dirty = False
+        return cached
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any], node_id: str) -> 'VectorClock':
-        """Create vector clock from dictionary."""
+        """
+        Create vector clock from dictionary.
+        
+        Raises ValueError if a counter doesn't fit in 64 bits.
+        """
         vc = cls(node_id)
-        vc.clock = {k: int(v) for k, v in data.items()}
+        vc._set_nodes(data)
+        counters = [int(data[node]) for node in vc._nodes]
+        if counters and (min(counters) < INT64_MIN or max(counters) > INT64_MAX):
+            raise ValueError("Vector clock counter exceeds 64-bit range")
+        vc.counters = _as_counters(counters)
+        vc._dirty = True
         return vc
     
     def __str__(self) -> str:
         """String representation of the vector clock."""
-        return f"VC({self.node_id}): {self.clock}"
+        return f"VC({self.node_id}): {self.to_dict()}"
     
     def __repr__(self) -> str:
         """Detailed string representation."""
-        return f"VectorClock(node_id='{self.node_id}', clock={self.clock})"
+        return f"VectorClock(node_id='{self.node_id}', clock={self.to_dict()})"
     
     def __eq__(self, other) -> bool:
         """Check if two vector clocks are equal."""
         if not isinstance(other, VectorClock):
             return False
-        return self.clock == other.clock
+        return self.to_dict() == other.to_dict()
 
 
 def test_vector_clock():